@@ -1,6 +1,8 @@
 #! /usr/bin/python
 # -*- coding: utf-8 -*-
 
+import collections
+import copy
 import inspect
 from abc import abstractmethod
 
@@ -14,7 +16,13 @@ from tensorlayer.layers.utils import (get_variable_with_initializer, list_remove
 
 __all__ = ['Layer', 'ModelLayer', 'LayerList']
 
-_global_layer_name_dict = {}  # TODO: better implementation?
+_global_layer_name_dict = collections.defaultdict(int)  # TODO: better implementation?
+
+# upper bound of the input signatures traced by a compiled LayerList, beyond it the forward runs eagerly
+_MAX_COMPILED_FORWARDS = 8
+
+# names of the input layer classes, filled on first use since tl.layers.inputs imports this module
+_input_layer_names = None
 
 _act_dict = {
     "relu": tf.nn.relu,
@@ -47,6 +55,13 @@ def str2act(act):
     return _act_dict[act]
 
 
+def _get_input_layer_names():
+    global _input_layer_names
+    if _input_layer_names is None:
+        _input_layer_names = frozenset(tl.layers.inputs.__all__)
+    return _input_layer_names
+
+
 class Layer(object):
     """The basic :class:`Layer` class represents a single layer of a neural network.
 
@@ -93,19 +108,14 @@ class Layer(object):
         if name is None:
             prefix = self.__class__.__name__.lower()
 
-            if _global_layer_name_dict.get(prefix) is not None:
-                _global_layer_name_dict[prefix] += 1
-                name = prefix + '_' + str(_global_layer_name_dict[prefix])
-            else:
-                _global_layer_name_dict[prefix] = 0
-                name = prefix
+            # auto names are prefix_1, prefix_2, ... skipping the names which are already registered
             while True:
-                if _global_layer_name_dict.get(name) is None:
-                    break
                 _global_layer_name_dict[prefix] += 1
-                name = prefix + '_' + str(_global_layer_name_dict[prefix])
+                name = '%s_%d' % (prefix, _global_layer_name_dict[prefix])
+                if name not in _global_layer_name_dict:
+                    break
         else:
-            if _global_layer_name_dict.get(name) is not None:
+            if name in _global_layer_name_dict:
                 pass
                 # raise ValueError(
                 #     'Layer name \'%s\' has already been used by another layer. Please change the layer name.' % name
@@ -121,6 +131,7 @@ class Layer(object):
 
         # Layer building state
         self._built = False
+        self._is_input_layer = self.__class__.__name__ in _get_input_layer_names()
 
         # Layer nodes state
         self._nodes = []
@@ -143,11 +154,10 @@ class Layer(object):
 
     @staticmethod
     def _compute_shape(tensors):
+        """Return the shape(s) passed to build() as list(s), it is only called when the layer is not built yet."""
         if isinstance(tensors, list):
-            shape_mem = [t.get_shape().as_list() for t in tensors]
-        else:
-            shape_mem = tensors.get_shape().as_list()
-        return shape_mem
+            return [t.shape.as_list() for t in tensors]
+        return tensors.shape.as_list()
 
     @property
     def config(self):
@@ -161,7 +171,7 @@ class Layer(object):
             self.layer_args.update(self.get_args())
             self.layer_args["name"] = self.name
             _config.update({"args": self.layer_args})
-            if self.__class__.__name__ in tl.layers.inputs.__all__:
+            if self._is_input_layer:
                 _config.update({'prev_layer': None})
             else:
                 _config.update({'prev_layer': []})
@@ -227,7 +237,7 @@ class Layer(object):
         :param kwargs:
         :return: Layer
         """
-        if self.__class__.__name__ in tl.layers.inputs.__all__:
+        if self._is_input_layer:
             input_tensors = tf.convert_to_tensor(inputs)
         else:
             input_tensors = inputs
@@ -254,16 +264,16 @@ class Layer(object):
 
         Parameters
         ----------
-        input_tensors : Tensor or a list of tensors
+        input_tensors : Tensor or a (nested) list or tuple of tensors
             Input tensors to this layer.
-        output_tensors : Tensor or a list of tensors
+        output_tensors : Tensor or a (nested) list or tuple of tensors
             Output tensors to this layer.
 
         """
-        inputs_list = tolist(input_tensors)
-        outputs_list = tolist(output_tensors)
+        inputs_list = _flatten(input_tensors)
+        outputs_list = _flatten(output_tensors)
 
-        if self.__class__.__name__ in tl.layers.inputs.__all__:
+        if self._is_input_layer:
             # for InputLayer, there should be no in_nodes
             in_nodes = []
             in_tensor_idxes = [0]
@@ -284,6 +294,10 @@ class Layer(object):
         self.inputs and self.outputs will be set as None but not deleted in order to release memory.
         """
         # FIXME : not understand why saving inputs/outputs shape
+        self._release_node_buffers()
+
+    def _release_node_buffers(self):
+        """Drop the tensors referenced by the LayerNodes, the LayerNodes themselves are kept for the graph topology."""
         for node in self._nodes:
             node.in_tensors = None
             node.out_tensors = None
@@ -295,17 +309,14 @@ class Layer(object):
     def _fix_nodes_for_layers(self):
         """ fix LayerNodes to stop growing for this layer"""
         self._nodes_fixed = True
+        self._release_node_buffers()
 
     def _get_weights(self, var_name, shape, init=tl.initializers.random_normal(), trainable=True):
         """ Get trainable variables. """
         weight = get_variable_with_initializer(scope_name=self.name, var_name=var_name, shape=shape, init=init)
         if trainable is True:
-            if self._trainable_weights is None:
-                self._trainable_weights = list()
             self._trainable_weights.append(weight)
         else:
-            if self._nontrainable_weights is None:
-                self._nontrainable_weights = list()
             self._nontrainable_weights.append(weight)
         return weight
 
@@ -420,10 +431,10 @@ class LayerNode(object):
         Index of this node in layer._nodes.
     in_nodes ：a list of LayerNode
         Father nodes to this node.
-    in_tensors : a list of tensors
-        Input tensors to this node.
-    out_tensors : a list of tensors
-        Output tensors to this node.
+    in_tensors : a list of tensors or None
+        Input tensors to this node. Set as None once the nodes of the layer are fixed.
+    out_tensors : a list of tensors or None
+        Output tensors to this node. Set as None once the nodes of the layer are fixed.
     in_tensor_idxes : a list of int
         Indexes of each input tensor in its corresponding node's out_tensors.
 
@@ -432,7 +443,7 @@ class LayerNode(object):
     __init__()
         Initializing the LayerNode.
     __call__()
-        (1) Forwarding through the layer. (2) Update its input/output tensors.
+        (1) Forwarding through the layer. (2) Update its input/output tensors if the nodes of the layer are not fixed.
     """
 
     def __init__(self, layer, node_index, in_nodes, in_tensors, out_tensors, in_tensor_idxes):
@@ -460,11 +471,18 @@ class LayerNode(object):
         self.visited = False
 
     def __call__(self, inputs, **kwargs):
-        """(1) Forwarding through the layer. (2) Update its input/output tensors."""
+        """
+        (1) Forwarding through the layer and return the output tensors as a list.
+        (2) Update its input/output tensors if the nodes of the layer are not fixed, the tensors are released
+        when the nodes are fixed (see Layer._release_node_buffers()) and are not kept afterwards.
+        """
         outputs = self.layer.forward(inputs, **kwargs)
-        self.in_tensors = tolist(inputs)
-        self.out_tensors = tolist(outputs)
-        return self.out_tensors
+        out_tensors = _flatten(outputs)
+        # once the nodes are fixed, the tensors are not kept to avoid holding the memory of the last forward
+        if not self.layer._nodes_fixed:
+            self.in_tensors = _flatten(inputs)
+            self.out_tensors = out_tensors
+        return out_tensors
 
 
 class ModelLayer(Layer):
@@ -515,7 +533,7 @@ class ModelLayer(Layer):
         # Layer training state
         self.is_train = True
 
-        logging.info("ModelLayer %s from Model: %s" % (self.name, self.model.name))
+        logging.info("ModelLayer %s from Model: %s", self.name, self.model.name)
 
     def __repr__(self):
         tmpstr = 'ModelLayer' + '(\n'
@@ -540,6 +558,7 @@ class ModelLayer(Layer):
     def _fix_nodes_for_layers(self):
         """ fix LayerNodes to stop growing for this ModelLayer."""
         self._nodes_fixed = True
+        self._release_node_buffers()
         self.model._fix_nodes_for_layers()
 
     def _release_memory(self):
@@ -570,9 +589,16 @@ class LayerList(Layer):
     Parameters
     ----------
     layers: list of Layer
-        A list of layers.
+        A list of layers. The layers can not be changed after the LayerList is created.
     name : str or None
         A unique layer name. If None, a unique name will be automatically assigned.
+    compile_forward : boolean
+        If True, once the LayerNodes are fixed the forward computation is traced into a ``tf.function``
+        for each input shape (apart from the batch size), dtype and training mode, so that the layer
+        instances run as one graph instead of one eager call per layer. The forward of every layer
+        instance must be free of Python side effects. A ValueError is raised for the known cases in
+        TensorLayer (BatchNorm, PRelu and ModelLayer), but this check is best-effort: users are responsible
+        for custom layers whose forward changes the layer state. Default False.
 
     Methods
     ---------
@@ -586,16 +612,42 @@ class LayerList(Layer):
         Forward the computation. The computation will go through all layer instances.
     """
 
-    def __init__(self, layers, name=None):
+    def __init__(self, layers, name=None, compile_forward=False):
         """
         Initializing the LayerList given a list of Layer.
 
         :param layers: list of Layer
         :param name: str or None
+        :param compile_forward: boolean
         """
 
         super(LayerList, self).__init__(name=name)
-        self.layers = layers
+        # the layer instances are never changed after initialization, so their forward can be resolved once
+        self.layers = tuple(layers)
+        self._forward_fns = tuple(layer.forward for layer in self.layers)
+        self.compile_forward = compile_forward
+        self._compiled_forward = {}
+        self._forward_chain = self._forward_layers
+
+        # all nested layer instances and the ModelLayers among them, for switching the training mode without recursion
+        self._flat_layers = []
+        self._flat_model_layers = []
+        for layer in self.layers:
+            self._flat_layers.append(layer)
+            if isinstance(layer, LayerList):
+                self._flat_layers.extend(layer._flat_layers)
+                self._flat_model_layers.extend(layer._flat_model_layers)
+            elif isinstance(layer, ModelLayer):
+                self._flat_model_layers.append(layer)
+
+        if compile_forward:
+            # these layers change their Python state in forward, which can not be traced into a tf.function
+            for layer in self._flat_layers:
+                if isinstance(layer, (tl.layers.BatchNorm, tl.layers.PRelu, ModelLayer)):
+                    raise ValueError(
+                        "LayerList with compile_forward=True does not support %s layer '%s'." %
+                        (layer.__class__.__name__, layer.name)
+                    )
 
         is_built = True
         for layer in self.layers:
@@ -609,12 +661,20 @@ class LayerList(Layer):
                 if self._all_weights is None:
                     self._all_weights = list()
                 self._all_weights.extend(layer.all_weights)
+        # weights shared by several layer instances are only kept once
+        self._trainable_weights = _remove_repeat_weights(self._trainable_weights)
+        self._nontrainable_weights = _remove_repeat_weights(self._nontrainable_weights)
+        if self._all_weights is not None:
+            self._all_weights = _remove_repeat_weights(self._all_weights)
         if is_built:
             self._built = True
+            self._generate_forward()
 
-        logging.info(
-            "LayerList %s including layers [%s]" % (self.name, ', '.join([layer.name for layer in self.layers]))
-        )
+        # skip joining the layer names when INFO is not logged
+        if logging.get_verbosity() <= logging.INFO:
+            logging.info(
+                "LayerList %s including layers [%s]", self.name, ', '.join(layer.name for layer in self.layers)
+            )
 
         # check layer name uniqueness in LayerList
         local_layer_name_set = set()
@@ -629,7 +689,7 @@ class LayerList(Layer):
 
     def __getitem__(self, idx):
         if isinstance(idx, slice):
-            return LayerList(list(self.layers)[idx])
+            return LayerList(self.layers[idx])
         else:
             return self.layers[idx]
 
@@ -637,22 +697,23 @@ class LayerList(Layer):
         return len(self.layers)
 
     def __repr__(self):
-        tmpstr = 'LayerList' + '(\n'
-        for idx, layer in enumerate(self.layers):
-            modstr = layer.__repr__()
-            modstr = _addindent(modstr, 2)
-            tmpstr = tmpstr + '  (' + str(idx) + '): ' + modstr + '\n'
-
-        tmpstr = tmpstr + ')'
-        return tmpstr
+        parts = ['LayerList(\n']
+        parts.extend('  (%d): %s\n' % (idx, _addindent(layer.__repr__(), 2)) for idx, layer in enumerate(self.layers))
+        parts.append(')')
+        return ''.join(parts)
 
     def build(self, inputs_shape):
         """
         Build the LayerList. The layer instances will be connected automatically one by one.
         """
         in_tensor = self._input_tensors
+        layers = self.layers
+        if self._nodes_fixed:
+            # no LayerNode is recorded, so the built layers after the last unbuilt one need not be forwarded
+            last_unbuilt = max((idx for idx, layer in enumerate(self.layers) if not layer._built), default=-1)
+            layers = self.layers[:last_unbuilt + 1]
         # in_layer = self._input_layer
-        for layer in self.layers:
+        for layer in layers:
             is_build = layer._built
             out_tensor = layer(in_tensor)
             # nlayer = layer(in_layer)
@@ -663,30 +724,83 @@ class LayerList(Layer):
             layer._built = True
             in_tensor = out_tensor
             # in_layer = nlayer
+        if self._all_weights is not None:
+            self._all_weights = _remove_repeat_weights(self._all_weights)
+        self._generate_forward()
 
     def forward(self, inputs):
         """
         Forward the computation. The computation will go through all layer instances.
         """
+        if self.compile_forward and self._nodes_fixed and isinstance(inputs, tf.Tensor) and tf.executing_eagerly():
+            compiled_forward = self._get_compiled_forward(inputs)
+            if compiled_forward is not None:
+                return compiled_forward(inputs)
+        return self._forward_chain(inputs)
+
+    def _forward_layers(self, inputs):
+        """Forward the computation through all layer instances one by one."""
         z = inputs
-        for layer in self.layers:
-            z = layer.forward(z)
+        for fn in self._forward_fns:
+            z = fn(z)
         return z
 
+    def _get_compiled_forward(self, inputs):
+        """Return the traced forward computation for the given inputs, or None if they can not be compiled."""
+        if not inputs.shape.rank:
+            return None
+        # the batch size is left dynamic so that e.g. a last partial batch does not trigger another trace
+        feature_shape = inputs.shape[1:].as_list()
+        key = (tuple(feature_shape), inputs.dtype, self.is_train)
+        compiled_forward = self._compiled_forward.get(key)
+        if compiled_forward is None:
+            if len(self._compiled_forward) >= _MAX_COMPILED_FORWARDS:
+                return None
+            # the generated chain is eager only: AutoGraph can not read its source, and the loop is traced once anyway
+            compiled_forward = tf.function(
+                self._forward_layers, input_signature=[tf.TensorSpec([None] + feature_shape, inputs.dtype)]
+            )
+            self._compiled_forward[key] = compiled_forward
+        return compiled_forward
+
+    def _generate_forward(self):
+        """
+        Generate a straight-line forward function over the layer instances, i.e. ``x = _l0(x); x = _l1(x); ...``,
+        which avoids the loop and the ``layer.forward`` lookups of each call once the LayerList is built.
+        """
+        forward_globals = {'_l%d' % idx: fn for idx, fn in enumerate(self._forward_fns)}
+        src = "def _forward(x):\n" + "".join("    x = _l%d(x)\n" % idx for idx in range(len(self._forward_fns)))
+        src += "    return x\n"
+        namespace = {}
+        exec(src, forward_globals, namespace)
+        self._forward_chain = namespace['_forward']
+
+    def __deepcopy__(self, memo):
+        # the generated forward and the traced functions refer to the original layer instances,
+        # so they are rebuilt from the copied layers instead of being copied
+        new_layerlist = self.__class__.__new__(self.__class__)
+        memo[id(self)] = new_layerlist
+        for key, value in self.__dict__.items():
+            if key not in ('_forward_chain', '_compiled_forward'):
+                new_layerlist.__dict__[key] = copy.deepcopy(value, memo)
+        new_layerlist.__dict__['_compiled_forward'] = {}
+        new_layerlist.__dict__['_forward_chain'] = new_layerlist._forward_layers
+        if new_layerlist._built:
+            new_layerlist._generate_forward()
+        return new_layerlist
+
     def _set_mode_for_layers(self, is_train):
         """Set training/evaluation mode for all layer instances."""
         self.is_train = is_train
-        for layer in self.layers:
-            if isinstance(layer, ModelLayer):
-                layer._set_mode_for_layers(is_train)
-            elif isinstance(layer, LayerList):
-                layer._set_mode_for_layers(is_train)
-            else:
-                layer.is_train = is_train
+        for layer in self._flat_layers:
+            layer.is_train = is_train
+        for layer in self._flat_model_layers:
+            layer._set_mode_for_layers(is_train)
 
     def _fix_nodes_for_layers(self):
         """ fix LayerNodes to stop growing for this LayerList."""
         self._nodes_fixed = True
+        self._release_node_buffers()
         for layer in self.layers:
             layer._fix_nodes_for_layers()
 
@@ -709,22 +823,24 @@ class LayerList(Layer):
 
 
 def _addindent(s_, numSpaces):
-    s = s_.split('\n')
-    # don't do anything for single-line stuff
-    if len(s) == 1:
-        return s_
-    first = s.pop(0)
-    s = [(numSpaces * ' ') + line for line in s]
-    s = '\n'.join(s)
-    s = first + '\n' + s
-    return s
-
-
-def tolist(tensors):
-    if isinstance(tensors, list) or isinstance(tensors, tuple):
-        ntensors = list()
-        for t in tensors:
-            ntensors += tolist(t)
-        return ntensors
-    else:
+    # indent every line after the first one, single-line stuff is left unchanged
+    return s_.replace('\n', '\n' + numSpaces * ' ')
+
+
+def _remove_repeat_weights(weights):
+    """Remove the repeated weights in a list by identity, keeping the order of their first appearance."""
+    # list_remove_repeat compares with ==, which is element-wise for tf.Variable
+    seen = set()
+    unique_weights = []
+    for w in weights:
+        if id(w) not in seen:
+            seen.add(id(w))
+            unique_weights.append(w)
+    return unique_weights
+
+
+def _flatten(tensors):
+    """Return the tensors as a flat list, a single tensor is wrapped without going through tf.nest."""
+    if isinstance(tensors, tf.Tensor):
         return [tensors]
+    return tf.nest.flatten(tensors)
@@ -113,6 +113,7 @@ class Lambda(Layer):
         self.fn = fn
         self._trainable_weights = fn_weights if fn_weights is not None else []
         self.fn_args = fn_args if fn_args is not None else {}
+        self._keras_input_shape = None
 
         try:
             fn_name = repr(self.fn)
@@ -158,12 +159,20 @@ class Lambda(Layer):
             init_args["fn_weights"] = None
             if len(self._nodes) == 0:
                 init_args["keras_input_shape"] = []
-            else:
+            elif self._nodes[0].in_tensors is not None:
                 init_args["keras_input_shape"] = self._nodes[0].in_tensors[0].get_shape().as_list()
+            else:
+                init_args["keras_input_shape"] = self._keras_input_shape
         else:
             init_args = {"layer_type": "normal"}
         return init_args
 
+    def _release_node_buffers(self):
+        # keep the input shape of the keras model for saving the graph
+        if len(self._nodes) > 0 and self._nodes[0].in_tensors is not None:
+            self._keras_input_shape = self._nodes[0].in_tensors[0].get_shape().as_list()
+        super(Lambda, self)._release_node_buffers()
+
 
 class ElementwiseLambda(Layer):
     """A layer that use a custom function to combine multiple :class:`Layer` inputs.
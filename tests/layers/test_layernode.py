@@ -230,6 +230,23 @@ class LayerNode_Test(CustomTestCase):
 
         self.assertEqual(len(net._node_by_depth), 10)
 
+    def test_release_node_buffers(self):
+        print('-' * 20, 'test_release_node_buffers', '-' * 20)
+
+        ni = Input([None, 100])
+        nn = Dense(50, name='release_dense1')(ni)
+        nn = Dense(10, name='release_dense2')(nn)
+        net = Model(inputs=ni, outputs=nn)
+
+        data = np.random.normal(size=[4, 100]).astype(np.float32)
+        out = net(data, is_train=False)
+        self.assertEqual(out.shape, (4, 10))
+
+        for layer in net.all_layers:
+            self.assertEqual(len(layer._nodes), 1)
+            self.assertIsNone(layer._nodes[0].in_tensors)
+            self.assertIsNone(layer._nodes[0].out_tensors)
+
 
 if __name__ == '__main__':
 
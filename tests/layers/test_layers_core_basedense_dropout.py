@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import copy
 import os
 import unittest
 
@@ -145,6 +146,135 @@ class Layer_Core_Test(CustomTestCase):
 
         model.release_memory()
 
+    def test_layerlist_set_mode(self):
+        inner = LayerList([Dense(n_units=10, in_channels=784), Dropout(keep=0.8)])
+        layerlist = LayerList([ModelLayer(self.model), inner, Dense(n_units=4, in_channels=10)])
+
+        layerlist._set_mode_for_layers(False)
+        self.assertFalse(inner.is_train)
+        self.assertFalse(inner[1].is_train)
+        self.assertFalse(layerlist[2].is_train)
+        self.assertFalse(layerlist[0].is_train)
+        self.assertFalse(self.model.all_layers[1].is_train)
+
+    def test_layerlist_shared_weights(self):
+        shared_w = tf.Variable(tf.ones([784, 10]))
+        layerlist = LayerList(
+            [
+                Lambda(lambda x: tf.matmul(x, shared_w), fn_weights=[shared_w]),
+                Lambda(lambda x: tf.matmul(x, shared_w), fn_weights=[shared_w])
+            ]
+        )
+        self.assertEqual(len(layerlist.trainable_weights), 1)
+        self.assertEqual(len(layerlist.all_weights), 1)
+
+    def test_layerlist_build_fixed_nodes(self):
+
+        class CountingDense(Dense):
+
+            def __init__(self, n_units, in_channels=None):
+                super(CountingDense, self).__init__(n_units=n_units, in_channels=in_channels)
+                self.n_forward = 0
+
+            def forward(self, inputs):
+                self.n_forward += 1
+                return super(CountingDense, self).forward(inputs)
+
+        class LayerListHolder(Layer):
+
+            def __init__(self):
+                super(LayerListHolder, self).__init__()
+                # assigning the LayerList as an attribute fixes its LayerNodes
+                self.layerlist = LayerList([Dense(n_units=10), CountingDense(n_units=4, in_channels=10)])
+
+            def build(self, inputs_shape):
+                pass
+
+            def forward(self, inputs):
+                return self.layerlist(inputs)
+
+        holder = LayerListHolder()
+        self.assertTrue(holder.layerlist._nodes_fixed)
+        self.assertFalse(holder.layerlist._built)
+
+        data = tf.convert_to_tensor(np.random.normal(size=[self.batch_size, 20]).astype(np.float32))
+        out = holder.forward(data)
+        self.assertEqual(out.get_shape().as_list(), [self.batch_size, 4])
+        self.assertEqual(len(holder.layerlist.all_weights), 4)
+        self.assertEqual(holder.layerlist.all_weights[2].get_shape().as_list(), [20, 10])
+        # the trailing built layer is only forwarded once by LayerList.forward, not during build
+        self.assertEqual(holder.layerlist[1].n_forward, 1)
+
+    def test_layerlist_deepcopy(self):
+        layerlist = LayerList([Dense(n_units=10, in_channels=784), Dense(n_units=4, in_channels=10)])
+        copied = copy.deepcopy(layerlist)
+        for w in copied.all_weights:
+            w.assign(tf.zeros_like(w))
+
+        data = tf.convert_to_tensor(np.random.normal(size=[self.batch_size, 784]).astype(np.float32))
+        self.assertTrue(np.allclose(copied.forward(data), np.zeros([self.batch_size, 4])))
+        self.assertTrue(np.allclose(copied.forward(data), copied._forward_layers(data)))
+        self.assertTrue(np.allclose(layerlist.forward(data), layerlist._forward_layers(data)))
+        self.assertFalse(np.allclose(layerlist.forward(data), np.zeros([self.batch_size, 4])))
+
+    def test_layerlist_compile_forward(self):
+        layerlist = LayerList(
+            [Dense(n_units=10, in_channels=784), Dropout(keep=0.8),
+             Dense(n_units=4, in_channels=10)], compile_forward=True
+        )
+        layerlist._fix_nodes_for_layers()
+        layerlist._set_mode_for_layers(False)
+
+        data = tf.convert_to_tensor(np.random.normal(size=[self.batch_size, 784]).astype(np.float32))
+        pred = layerlist(data)
+        self.assertEqual(len(layerlist._compiled_forward), 1)
+        self.assertTrue(np.allclose(pred, layerlist._forward_layers(data)))
+
+        layerlist(data)
+        self.assertEqual(len(layerlist._compiled_forward), 1)
+
+        # a different batch size reuses the same trace
+        pred = layerlist(data[:3])
+        self.assertEqual(pred.get_shape().as_list(), [3, 4])
+        self.assertEqual(len(layerlist._compiled_forward), 1)
+        self.assertTrue(np.allclose(pred, layerlist._forward_layers(data[:3])))
+
+    def test_layerlist_compile_forward_control_flow(self):
+
+        class AbsSumLayer(Layer):
+
+            def __init__(self):
+                super(AbsSumLayer, self).__init__()
+                self.build(None)
+                self._built = True
+
+            def build(self, inputs_shape):
+                pass
+
+            def forward(self, inputs):
+                # tensor-dependent Python control flow, only valid in a graph after AutoGraph conversion
+                if tf.reduce_sum(inputs) > 0:
+                    return inputs
+                return -inputs
+
+        layerlist = LayerList([Dense(n_units=4, in_channels=784), AbsSumLayer()], compile_forward=True)
+        layerlist._fix_nodes_for_layers()
+        layerlist._set_mode_for_layers(False)
+
+        data = tf.convert_to_tensor(np.random.normal(size=[self.batch_size, 784]).astype(np.float32))
+        pred = layerlist(data)
+        self.assertEqual(len(layerlist._compiled_forward), 1)
+        self.assertTrue(np.allclose(pred, layerlist._forward_layers(data)))
+        self.assertTrue(np.allclose(layerlist(-data), layerlist._forward_layers(-data)))
+
+    def test_layerlist_compile_forward_unsupported(self):
+        with self.assertRaises(ValueError):
+            LayerList([Dense(n_units=10, in_channels=784), BatchNorm(num_features=10)], compile_forward=True)
+        with self.assertRaises(ValueError):
+            LayerList([Dense(n_units=10, in_channels=784), PRelu(in_channels=10)], compile_forward=True)
+        with self.assertRaises(ValueError):
+            LayerList([LayerList([ModelLayer(self.model)]), Dense(n_units=4, in_channels=10)], compile_forward=True)
+
     def test_duplicate_names(self):
         dense1 = tl.layers.Dense(n_units=10, name='test_densehh')
         print(dense1)